@@ -0,0 +1,36 @@
+"""Index rooms by updated_at and add rooms_archive table
+
+Revision ID: 002_rooms_updated_at_index
+Revises: 001_initial
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002_rooms_updated_at_index'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_rooms_updated_at_id', 'rooms', ['updated_at', 'id'])
+    op.create_table(
+        'rooms_archive',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('code', sa.Text(), nullable=True),
+        sa.Column('language', sa.String(50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('rooms_archive')
+    op.drop_index('ix_rooms_updated_at_id', table_name='rooms')
@@ -0,0 +1,131 @@
+"""Store room code as compressed, content-addressed blobs
+
+Revision ID: 003_code_blobs
+Revises: 002_rooms_updated_at_index
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+import hashlib
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003_code_blobs'
+down_revision: Union[str, None] = '002_rooms_updated_at_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+rooms = sa.table(
+    'rooms',
+    sa.column('id', sa.String),
+    sa.column('code', sa.Text),
+    sa.column('code_hash', sa.String),
+)
+
+rooms_archive = sa.table(
+    'rooms_archive',
+    sa.column('id', sa.String),
+    sa.column('code', sa.Text),
+    sa.column('code_hash', sa.String),
+)
+
+code_blobs = sa.table(
+    'code_blobs',
+    sa.column('hash', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('size', sa.Integer),
+    sa.column('last_used_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'code_blobs',
+        sa.Column('hash', sa.String(64), primary_key=True),
+        sa.Column('data', sa.LargeBinary(length=16777215), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    )
+    op.add_column('rooms', sa.Column('code_hash', sa.String(64), nullable=True))
+    op.create_index('ix_rooms_code_hash', 'rooms', ['code_hash'])
+    op.create_foreign_key(
+        'fk_rooms_code_hash', 'rooms', 'code_blobs', ['code_hash'], ['hash']
+    )
+    op.add_column('rooms_archive',
+                  sa.Column('code_hash', sa.String(64), nullable=True))
+    op.create_index('ix_rooms_archive_code_hash',
+                    'rooms_archive', ['code_hash'])
+
+    # Move existing code into blobs in batches. Each statement commits on
+    # its own (autocommit), so row locks are never held for the whole run;
+    # rooms not reached yet stay readable through the legacy column.
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        while True:
+            batch = conn.execute(
+                sa.select(rooms.c.id, rooms.c.code)
+                .where(rooms.c.code_hash.is_(None), rooms.c.code.isnot(None))
+                .limit(BATCH_SIZE)
+            ).fetchall()
+            if not batch:
+                break
+
+            now = datetime.utcnow()
+            for room_id, code in batch:
+                data = code.encode('utf-8')
+                code_hash = hashlib.sha256(data).hexdigest()
+                stmt = mysql_insert(code_blobs).values(
+                    hash=code_hash,
+                    data=zlib.compress(data, 6),
+                    size=len(data),
+                    last_used_at=now,
+                )
+                conn.execute(stmt.on_duplicate_key_update(last_used_at=now))
+                conn.execute(
+                    rooms.update()
+                    .where(rooms.c.id == room_id)
+                    .values(code_hash=code_hash, code=None)
+                )
+
+
+def _restore_code(conn, table) -> None:
+    """Copy code back from the blobs into the table's code column."""
+    while True:
+        batch = conn.execute(
+            sa.select(table.c.id, code_blobs.c.data)
+            .join(code_blobs, table.c.code_hash == code_blobs.c.hash)
+            .where(table.c.code.is_(None))
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+
+        for room_id, data in batch:
+            conn.execute(
+                table.update()
+                .where(table.c.id == room_id)
+                .values(code=zlib.decompress(data).decode('utf-8'))
+            )
+
+
+def downgrade() -> None:
+    # Archived rooms saved after the upgrade only have code in the blobs too
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        _restore_code(conn, rooms)
+        _restore_code(conn, rooms_archive)
+
+    op.drop_index('ix_rooms_archive_code_hash', table_name='rooms_archive')
+    op.drop_column('rooms_archive', 'code_hash')
+    op.drop_constraint('fk_rooms_code_hash', 'rooms', type_='foreignkey')
+    op.drop_index('ix_rooms_code_hash', table_name='rooms')
+    op.drop_column('rooms', 'code_hash')
+    op.drop_table('code_blobs')
@@ -38,6 +38,11 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db():
-    """Initialize database tables."""
+    """
+    Initialize database tables.
+
+    Only used for local development (AUTO_CREATE_SCHEMA=true); deployments
+    create the schema with `alembic upgrade head`.
+    """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
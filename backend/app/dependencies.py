@@ -0,0 +1,20 @@
+from fastapi import Header, HTTPException
+import hmac
+from app.config import get_settings
+
+settings = get_settings()
+
+
+async def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    """
+    Dependency guarding admin-only endpoints with the ADMIN_TOKEN setting.
+
+    Used by the /admin profiling endpoints and the GET /rooms listing.
+    """
+    if not settings.ADMIN_TOKEN:
+        # Admin surface is disabled unless a token is configured
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(
+        x_admin_token, settings.ADMIN_TOKEN
+    ):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
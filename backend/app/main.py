@@ -6,7 +6,11 @@ from contextlib import asynccontextmanager
 
 from app.config import get_settings
 from app.database import init_db
-from app.routers import rooms, autocomplete, websocket
+from app.routers import rooms, autocomplete, websocket, admin
+from app.services.connection_manager import manager
+from app.services.snapshot_service import SnapshotService
+from app.services.room_sweeper import sweeper
+from app.services.profiling import lag_monitor
 
 settings = get_settings()
 uvicorn.config.Config.ws_per_message_deflate = False
@@ -16,11 +20,42 @@ uvicorn.config.Config.ws_per_message_deflate = False
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup and shutdown events."""
     # Startup
-    await init_db()
-    print("Database initialized successfully")
+    lag_monitor.start(
+        settings.LOOP_LAG_THRESHOLD_MS / 1000,
+        settings.LOOP_LAG_CHECK_INTERVAL_MS / 1000
+    )
+
+    if settings.AUTO_CREATE_SCHEMA:
+        await init_db()
+        print("Database initialized successfully")
+
+    # Warm up room states before the worker reports ready
+    try:
+        loaded = await SnapshotService.preload(
+            manager,
+            settings.ROOM_SNAPSHOT_PATH,
+            settings.ROOM_SNAPSHOT_MAX_AGE,
+            settings.PRELOAD_ROOM_LIMIT,
+            websocket.save_room_to_db
+        )
+        print(f"Preloaded {loaded} rooms")
+    except Exception as e:
+        print(f"Room preload failed: {e}")
+
+    sweeper.start()
+    manager.start_reaper(settings.WS_REAP_INTERVAL, settings.WS_IDLE_TIMEOUT)
     yield
     # Shutdown
     print("Application shutting down")
+    await manager.stop_reaper()
+    await sweeper.stop()
+    await lag_monitor.stop()
+    await SnapshotService.shutdown(
+        manager,
+        settings.ROOM_SNAPSHOT_PATH,
+        settings.PRELOAD_ROOM_LIMIT,
+        websocket.save_room_to_db
+    )
 
 
 # Create FastAPI application
@@ -46,6 +81,7 @@ app.add_middleware(
 app.include_router(rooms.router)
 app.include_router(autocomplete.router)
 app.include_router(websocket.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -62,3 +98,13 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        ws_ping_interval=settings.WS_PING_INTERVAL,
+        ws_ping_timeout=settings.WS_PING_TIMEOUT
+    )
@@ -1,17 +1,64 @@
-from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy import Column, String, Text, DateTime, Index, Integer, LargeBinary, ForeignKey
+from sqlalchemy.orm import relationship
 from app.database import Base
+import hashlib
 import uuid
+import zlib
 from datetime import datetime
 
+DEFAULT_CODE = "# Start coding here...\n"
+
+
+class CodeBlob(Base):
+    """Compressed code body, stored once per distinct content (SHA-256)."""
+
+    __tablename__ = "code_blobs"
+
+    hash = Column(String(64), primary_key=True)
+    # MEDIUMBLOB on MySQL
+    data = Column(LargeBinary(length=16777215), nullable=False)
+    # Uncompressed size in bytes
+    size = Column(Integer, nullable=False)
+    # Bumped whenever a save references this blob; orphan GC keys off it
+    last_used_at = Column(DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def hash_code(code: str) -> str:
+        """Content hash used as the blob key."""
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def compress(code: str) -> bytes:
+        """Compress a code body for storage."""
+        return zlib.compress(code.encode("utf-8"), 6)
+
+    @property
+    def text(self) -> str:
+        """Decompressed code body (decompressed on first access)."""
+        text = self.__dict__.get("_text")
+        if text is None:
+            text = zlib.decompress(self.data).decode("utf-8")
+            self._text = text
+        return text
+
+    def __repr__(self):
+        return f"<CodeBlob(hash={self.hash}, size={self.size})>"
+
 
 class Room(Base):
     """Room model for storing collaborative editing rooms."""
 
     __tablename__ = "rooms"
+    __table_args__ = (
+        # Keyset pagination and TTL sweeps scan by (updated_at, id)
+        Index("ix_rooms_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True,
                 default=lambda: str(uuid.uuid4()))
-    code = Column(Text, default="# Start coding here...\n")
+    code_hash = Column(String(64), ForeignKey("code_blobs.hash"), index=True)
+    # Pre-content-addressing code column, kept for rows not yet migrated
+    legacy_code = Column("code", Text, nullable=True)
     language = Column(String(50), default="python")
     # Use Python-side defaults for MySQL 5.5 compatibility
     # (MySQL 5.5 only allows one TIMESTAMP with CURRENT_TIMESTAMP)
@@ -19,5 +66,38 @@ class Room(Base):
     updated_at = Column(DateTime, default=datetime.utcnow,
                         onupdate=datetime.utcnow)
 
+    blob = relationship(CodeBlob, lazy="joined")
+
+    @property
+    def code(self) -> str:
+        """Current code body, decompressed lazily from the code blob."""
+        code = self.__dict__.get("_code")
+        if code is None:
+            if self.code_hash is not None and self.blob is not None:
+                code = self.blob.text
+            elif self.legacy_code is not None:
+                code = self.legacy_code
+            else:
+                code = DEFAULT_CODE
+            self._code = code
+        return code
+
     def __repr__(self):
         return f"<Room(id={self.id}, language={self.language})>"
+
+
+class RoomArchive(Base):
+    """Rooms moved out of the hot table after being idle past the TTL."""
+
+    __tablename__ = "rooms_archive"
+
+    id = Column(String(36), primary_key=True)
+    code_hash = Column(String(64), index=True)
+    code = Column(Text)
+    language = Column(String(50))
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<RoomArchive(id={self.id}, language={self.language})>"
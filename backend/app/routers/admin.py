@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.dependencies import require_admin
+from app.services.profiling import profiler, timings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def run_profile(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval_ms: float = Query(5.0, ge=1, le=1000)
+):
+    """
+    Sample the event loop for a few seconds.
+
+    Returns folded stacks (flamegraph.pl / speedscope format).
+    """
+    try:
+        folded = await profiler.profile(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+    )
+
+
+@router.get("/timings", dependencies=[Depends(require_admin)])
+async def get_timings():
+    """
+    Get per-handler call counts and latencies.
+    """
+    return {"enabled": timings.enabled, "handlers": timings.snapshot()}
+
+
+@router.post("/timings", dependencies=[Depends(require_admin)])
+async def set_timings(enabled: bool = True, reset: bool = False):
+    """
+    Turn per-handler timing on or off, optionally clearing collected stats.
+    """
+    timings.enabled = enabled
+    if reset:
+        timings.reset()
+    return {"enabled": timings.enabled}
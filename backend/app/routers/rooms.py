@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.schemas.room import RoomCreate, RoomResponse
+from app.schemas.room import RoomCreate, RoomResponse, RoomBatchCreate, RoomBatchFetch
 from app.services.room_service import RoomService
+from app.dependencies import require_admin
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
@@ -25,6 +26,82 @@ async def create_room(
     }
 
 
+@router.get("", dependencies=[Depends(require_admin)])
+async def list_rooms(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    List rooms, most recently updated first (admin only - room IDs grant
+    access to the room). Needs ADMIN_TOKEN to be set.
+
+    Pass the returned `nextCursor` as `cursor` to fetch the next page.
+    """
+    try:
+        rooms, next_cursor = await RoomService.list_rooms(db, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return {
+        "rooms": [
+            {
+                "roomId": room.id,
+                "language": room.language,
+                "created_at": room.created_at,
+                "updated_at": room.updated_at
+            }
+            for room in rooms
+        ],
+        "nextCursor": next_cursor
+    }
+
+
+@router.post("/batch", response_model=dict)
+async def create_rooms(
+    batch: RoomBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create several collaborative editing rooms in one request.
+    """
+    rooms = await RoomService.create_rooms(db, batch.rooms)
+    return {
+        "rooms": [
+            {
+                "roomId": room.id,
+                "code": room.code,
+                "language": room.language
+            }
+            for room in rooms
+        ]
+    }
+
+
+@router.post("/batch/fetch", response_model=dict)
+async def get_rooms(
+    batch: RoomBatchFetch,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get several rooms by ID. Unknown IDs are listed in `missing`.
+    """
+    rooms = await RoomService.get_rooms(db, batch.roomIds)
+    found = {room.id for room in rooms}
+    return {
+        "rooms": [
+            {
+                "roomId": room.id,
+                "code": room.code,
+                "language": room.language,
+                "created_at": room.created_at
+            }
+            for room in rooms
+        ],
+        "missing": [room_id for room_id in batch.roomIds if room_id not in found]
+    }
+
+
 @router.get("/{room_id}")
 async def get_room(
     room_id: str,
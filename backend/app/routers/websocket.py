@@ -1,17 +1,87 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict
+import asyncio
 import json
 from app.database import get_db, async_session_maker
 from app.services.connection_manager import manager
 from app.services.room_service import RoomService
+from app.models.room import CodeBlob
+from app.services.profiling import timings
 
 router = APIRouter(tags=["websocket"])
 
+# Legacy application-level keep-alive, answered without JSON round trips.
+# Liveness is handled by protocol-level ping/pong (see WS_PING_INTERVAL).
+PING_MESSAGE = '{"type":"ping"}'
+PONG_MESSAGE = '{"type":"pong"}'
+
+# Handler timing names per message type (fixed set, so clients can't add keys)
+MESSAGE_TIMER_NAMES = {
+    "code_update": "ws.code_update",
+    "cursor_update": "ws.cursor_update",
+    "ping": "ws.ping",
+}
+
+# Close code sent to spectators of a room that doesn't exist
+ROOM_NOT_FOUND_CLOSE_CODE = 4404
+
+# In-flight cold loads, so concurrent joins of a room share one lookup
+_room_loads: Dict[str, asyncio.Task] = {}
+
 
 async def save_room_to_db(room_id: str, code: str) -> None:
     """Save room code to database - used as callback for debounced saves."""
+    # Unchanged content: skip the save without touching the database
+    code_hash = CodeBlob.hash_code(code)
+    if manager.get_saved_hash(room_id) == code_hash:
+        return
+
     async with async_session_maker() as db:
-        await RoomService.update_room_code(db, room_id, code)
+        await RoomService.update_room_code(
+            db, room_id, code, manager.room_languages.get(room_id), code_hash
+        )
+    manager.set_saved_hash(room_id, code_hash)
+
+
+async def _fetch_room_state(room_id: str, create: bool) -> bool:
+    """Load a room from the database into the connection manager."""
+    try:
+        async with async_session_maker() as db:
+            if create:
+                room = await RoomService.get_or_create_room(db, room_id)
+            else:
+                room = await RoomService.get_room(db, room_id)
+        if room is None:
+            return False
+        if not manager.has_room_state(room_id):
+            manager.set_initial_state(
+                room_id, room.code, room.language, saved_hash=room.code_hash
+            )
+        return True
+    finally:
+        _room_loads.pop(room_id, None)
+
+
+async def load_room_state(room_id: str, create: bool = True) -> bool:
+    """
+    Load a room's initial state (skipped for warm rooms).
+
+    Creates the room if it doesn't exist unless `create` is False.
+    Concurrent calls for the same room share one database lookup.
+    Returns whether the room exists.
+    """
+    while not manager.has_room_state(room_id):
+        task = _room_loads.get(room_id)
+        if task is None:
+            task = asyncio.create_task(_fetch_room_state(room_id, create))
+            _room_loads[room_id] = task
+        # Shielded so one cancelled join doesn't cancel the others' load
+        found = await asyncio.shield(task)
+        if found or not create:
+            return found
+        # Joined a lookup that doesn't create the room: load again
+    return True
 
 
 @router.websocket("/ws/{room_id}")
@@ -25,10 +95,7 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     - Cursor position updates
     - Disconnection cleanup
     """
-    # Get or create room and load initial state
-    async with async_session_maker() as db:
-        room = await RoomService.get_or_create_room(db, room_id)
-        manager.set_initial_state(room_id, room.code)
+    await load_room_state(room_id)
 
     # Connect the WebSocket
     await manager.connect(websocket, room_id)
@@ -47,44 +114,56 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         while True:
             # Receive message from client
             data = await websocket.receive_text()
+            manager.touch(websocket)
+
+            if data == PING_MESSAGE:
+                await websocket.send_text(PONG_MESSAGE)
+                continue
+
             message = json.loads(data)
 
             message_type = message.get("type", "code_update")
-
-            if message_type == "code_update":
-                # Update in-memory state immediately (fast!)
-                code = message.get("code", "")
-                manager.update_room_state(room_id, code)
-
-                # Schedule debounced database save (2 seconds after last change)
-                manager.schedule_save(room_id, save_room_to_db)
-
-                # Broadcast to other users immediately (no waiting for DB)
-                await manager.broadcast_to_room(
-                    room_id,
-                    {
-                        "type": "code_update",
-                        "code": code,
-                        "cursorPosition": message.get("cursorPosition")
-                    },
-                    exclude=websocket
-                )
-
-            elif message_type == "cursor_update":
-                # Broadcast cursor position to other users
-                await manager.broadcast_to_room(
-                    room_id,
-                    {
-                        "type": "cursor_update",
-                        "cursorPosition": message.get("cursorPosition"),
-                        "userId": message.get("userId")
-                    },
-                    exclude=websocket
-                )
-
-            elif message_type == "ping":
-                # Keep-alive ping
-                await websocket.send_json({"type": "pong"})
+            if not isinstance(message_type, str):
+                # Unhashable/odd types can't be dispatched; ignore them
+                continue
+
+            with timings.measure(
+                MESSAGE_TIMER_NAMES.get(message_type, "ws.unknown")
+            ):
+                if message_type == "code_update":
+                    # Update in-memory state immediately (fast!)
+                    code = message.get("code", "")
+                    manager.update_room_state(room_id, code)
+
+                    # Schedule debounced database save (2 seconds after last change)
+                    manager.schedule_save(room_id, save_room_to_db)
+
+                    # Broadcast to other users immediately (no waiting for DB)
+                    await manager.broadcast_to_room(
+                        room_id,
+                        {
+                            "type": "code_update",
+                            "code": code,
+                            "cursorPosition": message.get("cursorPosition")
+                        },
+                        exclude=websocket
+                    )
+
+                elif message_type == "cursor_update":
+                    # Broadcast cursor position to other users
+                    await manager.broadcast_to_room(
+                        room_id,
+                        {
+                            "type": "cursor_update",
+                            "cursorPosition": message.get("cursorPosition"),
+                            "userId": message.get("userId")
+                        },
+                        exclude=websocket
+                    )
+
+                elif message_type == "ping":
+                    # Keep-alive ping (non-canonical encoding)
+                    await websocket.send_text(PONG_MESSAGE)
 
     except WebSocketDisconnect:
         # Force save any pending changes before disconnecting
@@ -109,3 +188,36 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
         # Handle other errors
         manager.disconnect(websocket, room_id)
         print(f"WebSocket error: {e}")
+
+
+@router.websocket("/ws/{room_id}/watch")
+async def spectator_endpoint(websocket: WebSocket, room_id: str):
+    """
+    Read-only WebSocket endpoint for large audiences.
+
+    Spectators receive "init" and batched "code_update" messages only.
+    Anything they send other than a keep-alive ping is ignored.
+    Spectators can't create rooms: joining a missing room closes the
+    connection with code 4404.
+    """
+    if not await load_room_state(room_id, create=False):
+        await websocket.accept()
+        await websocket.close(code=ROOM_NOT_FOUND_CLOSE_CODE, reason="Room not found")
+        return
+
+    try:
+        await manager.connect_spectator(websocket, room_id)
+
+        while True:
+            data = await websocket.receive_text()
+            if data == PING_MESSAGE:
+                await websocket.send_text(PONG_MESSAGE)
+
+    except WebSocketDisconnect:
+        pass
+
+    except Exception as e:
+        print(f"Spectator WebSocket error: {e}")
+
+    finally:
+        manager.disconnect_spectator(websocket, room_id)
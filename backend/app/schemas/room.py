@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+
+# Upper bound on rooms per batch request
+MAX_BATCH_SIZE = 100
 
 
 class RoomCreate(BaseModel):
@@ -8,6 +11,16 @@ class RoomCreate(BaseModel):
     language: Optional[str] = "python"
 
 
+class RoomBatchCreate(BaseModel):
+    """Schema for creating several rooms in one request."""
+    rooms: List[RoomCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class RoomBatchFetch(BaseModel):
+    """Schema for fetching several rooms by ID in one request."""
+    roomIds: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
 class RoomResponse(BaseModel):
     """Schema for room response."""
     roomId: str
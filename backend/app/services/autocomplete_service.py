@@ -1,5 +1,6 @@
 import re
 from app.schemas.room import AutocompleteRequest, AutocompleteResponse
+from app.services.profiling import timed
 
 
 class AutocompleteService:
@@ -51,6 +52,7 @@ class AutocompleteService:
     }
 
     @staticmethod
+    @timed("AutocompleteService.get_autocomplete")
     def get_autocomplete(request: AutocompleteRequest) -> AutocompleteResponse:
         """Generate a mocked autocomplete suggestion based on code context."""
         code = request.code
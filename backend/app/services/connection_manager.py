@@ -1,7 +1,11 @@
 from fastapi import WebSocket
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, Iterable, List
 import asyncio
 import json
+import time
+from app.config import get_settings
+
+settings = get_settings()
 
 
 class ConnectionManager:
@@ -12,12 +16,33 @@ class ConnectionManager:
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         # room_id -> current code state (in-memory cache)
         self.room_states: Dict[str, str] = {}
+        # room_id -> number of in-memory edits applied to the room state
+        self.room_revisions: Dict[str, int] = {}
+        # room_id -> room language (as stored in the database)
+        self.room_languages: Dict[str, str] = {}
+        # room_id -> content hash of the code last saved to / loaded from the DB
+        self._saved_hashes: Dict[str, str] = {}
+        # room_id -> wall-clock time the room was last loaded, joined or edited
+        self._room_touched: Dict[str, float] = {}
         # room_id -> pending save task for debouncing
         self._save_tasks: Dict[str, asyncio.Task] = {}
         # room_id -> flag indicating if state is dirty (needs saving)
         self._dirty_rooms: Set[str] = set()
         # Debounce delay in seconds
         self.SAVE_DEBOUNCE_DELAY = 2.0
+        # WebSocket -> room_id it is connected to
+        self._connection_rooms: Dict[WebSocket, str] = {}
+        # WebSocket -> monotonic time of the last message received from it
+        self._last_seen: Dict[WebSocket, float] = {}
+        self._reaper_task: asyncio.Task | None = None
+        # room_id -> read-only spectator connections (not in active_connections)
+        self.spectators: Dict[str, Set[WebSocket]] = {}
+        # room_id -> task batching room updates out to spectators
+        self._spectator_tasks: Dict[str, asyncio.Task] = {}
+        # Seconds between spectator update batches
+        self.SPECTATOR_FLUSH_INTERVAL = settings.SPECTATOR_FLUSH_INTERVAL
+        # Spectators that take longer than this to accept a frame are dropped
+        self.SPECTATOR_SEND_TIMEOUT = settings.SPECTATOR_SEND_TIMEOUT
 
     async def connect(self, websocket: WebSocket, room_id: str) -> None:
         """Accept a new WebSocket connection and add it to the room."""
@@ -27,6 +52,9 @@ class ConnectionManager:
             self.active_connections[room_id] = set()
 
         self.active_connections[room_id].add(websocket)
+        self._room_touched[room_id] = time.time()
+        self._connection_rooms[websocket] = room_id
+        self._last_seen[websocket] = time.monotonic()
 
         # Send current room state to the new connection
         if room_id in self.room_states:
@@ -37,6 +65,9 @@ class ConnectionManager:
 
     def disconnect(self, websocket: WebSocket, room_id: str) -> None:
         """Remove a WebSocket connection from the room."""
+        self._connection_rooms.pop(websocket, None)
+        self._last_seen.pop(websocket, None)
+
         if room_id in self.active_connections:
             self.active_connections[room_id].discard(websocket)
 
@@ -55,31 +86,316 @@ class ConnectionManager:
             return
 
         disconnected = set()
+        # Encode once for the whole room
+        frame = self._encode(message)
 
-        for connection in self.active_connections[room_id]:
+        # Copy - connections may come and go while we await sends
+        for connection in list(self.active_connections[room_id]):
             if connection != exclude:
                 try:
-                    await connection.send_json(message)
+                    await connection.send_text(frame)
                 except Exception:
                     disconnected.add(connection)
 
         # Clean up disconnected connections
         for conn in disconnected:
-            self.active_connections[room_id].discard(conn)
+            self.disconnect(conn, room_id)
+
+    @staticmethod
+    def _encode(message: dict) -> str:
+        """Encode a message the same way WebSocket.send_json does."""
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    async def connect_spectator(self, websocket: WebSocket, room_id: str) -> None:
+        """
+        Accept a read-only spectator connection.
+
+        Spectators get batched code updates only - no cursor or presence
+        traffic - and don't count towards the room's user count.
+        """
+        await websocket.accept()
+
+        if room_id not in self.spectators:
+            self.spectators[room_id] = set()
+        self.spectators[room_id].add(websocket)
+        self._room_touched[room_id] = time.time()
+
+        await websocket.send_text(self._encode({
+            "type": "init",
+            "code": self.get_room_state(room_id)
+        }))
+
+        if room_id not in self._spectator_tasks:
+            self._spectator_tasks[room_id] = asyncio.create_task(
+                self._flush_spectators(room_id, self.room_revisions.get(room_id, 0))
+            )
+
+    def disconnect_spectator(self, websocket: WebSocket, room_id: str) -> None:
+        """Remove a spectator connection from the room."""
+        if room_id in self.spectators:
+            self.spectators[room_id].discard(websocket)
+
+            if not self.spectators[room_id]:
+                del self.spectators[room_id]
+                task = self._spectator_tasks.pop(room_id, None)
+                if task is not None:
+                    task.cancel()
+
+    def get_spectator_count(self, room_id: str) -> int:
+        """Get the number of spectators watching a room."""
+        return len(self.spectators.get(room_id, set()))
+
+    async def _send_spectator_frame(self, websocket: WebSocket, frame: str) -> bool:
+        try:
+            await asyncio.wait_for(
+                websocket.send_text(frame), self.SPECTATOR_SEND_TIMEOUT
+            )
+            return True
+        except Exception:
+            return False
+
+    async def _drop_spectators(self, room_id: str, websockets: List[WebSocket]) -> None:
+        """
+        Close and remove spectators whose sends failed or timed out.
+
+        A timed-out send may have been cancelled mid-frame, so the socket
+        can't be reused; closing it makes the client reconnect.
+        """
+        await asyncio.gather(
+            *(
+                asyncio.wait_for(
+                    ws.close(code=1013), self.SPECTATOR_SEND_TIMEOUT
+                )
+                for ws in websockets
+            ),
+            return_exceptions=True
+        )
+        # Removing the last spectator cancels this flush task, so do it last
+        for websocket in websockets:
+            self.disconnect_spectator(websocket, room_id)
+
+    async def _flush_spectators(self, room_id: str, sent_revision: int) -> None:
+        """
+        Push the latest room state to spectators once per flush interval.
+
+        Edits in between are coalesced into one pre-encoded frame shared by
+        every spectator, so editors never wait on spectator sends.
+        `sent_revision` is the revision spectators got in their init frame.
+        """
+        try:
+            while room_id in self.spectators:
+                await asyncio.sleep(self.SPECTATOR_FLUSH_INTERVAL)
+
+                revision = self.room_revisions.get(room_id, 0)
+                if revision == sent_revision:
+                    continue
+                sent_revision = revision
+
+                frame = self._encode({
+                    "type": "code_update",
+                    "code": self.get_room_state(room_id)
+                })
+                spectators = list(self.spectators.get(room_id, ()))
+                results = await asyncio.gather(*(
+                    self._send_spectator_frame(ws, frame) for ws in spectators
+                ))
+                failed = [ws for ws, ok in zip(spectators, results) if not ok]
+                if failed:
+                    await self._drop_spectators(room_id, failed)
+        except asyncio.CancelledError:
+            pass
+
+    def touch(self, websocket: WebSocket) -> None:
+        """Record activity on a connection (resets its idle deadline)."""
+        if websocket in self._last_seen:
+            self._last_seen[websocket] = time.monotonic()
+
+    async def reap_idle_connections(self, idle_timeout: float) -> int:
+        """
+        Close connections with no activity for longer than idle_timeout.
+
+        Only received messages count as activity (protocol pongs aren't
+        visible here), so editors who are just reading get closed too.
+        Spectators are not tracked; dead spectator sockets are caught by
+        protocol pings and send timeouts.
+
+        The connection is removed from its room immediately; the endpoint
+        handling it sees the close and runs its usual cleanup.
+        Returns the number of connections closed.
+        """
+        deadline = time.monotonic() - idle_timeout
+        idle = [ws for ws, seen in self._last_seen.items() if seen < deadline]
+
+        for websocket in idle:
+            room_id = self._connection_rooms.get(websocket)
+            if room_id is not None:
+                self.disconnect(websocket, room_id)
+
+        # Close in parallel so one half-open socket can't stall the others;
+        # errors mean the socket was already closed or half-open
+        await asyncio.gather(
+            *(websocket.close(code=1001) for websocket in idle),
+            return_exceptions=True
+        )
+
+        return len(idle)
+
+    def start_reaper(self, interval: float, idle_timeout: float) -> None:
+        """Start the background idle-connection reaper."""
+        if idle_timeout <= 0 or self._reaper_task is not None:
+            return
+
+        async def reaper():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    reaped = await self.reap_idle_connections(idle_timeout)
+                    if reaped:
+                        print(f"Closed {reaped} idle connections")
+                except Exception as e:
+                    print(f"Error reaping connections: {e}")
+
+        self._reaper_task = asyncio.create_task(reaper())
+
+    async def stop_reaper(self) -> None:
+        """Stop the background idle-connection reaper."""
+        if self._reaper_task is None:
+            return
+        self._reaper_task.cancel()
+        try:
+            await self._reaper_task
+        except asyncio.CancelledError:
+            pass
+        self._reaper_task = None
 
     def update_room_state(self, room_id: str, code: str) -> None:
         """Update the in-memory code state for a room."""
         self.room_states[room_id] = code
+        self.room_revisions[room_id] = self.room_revisions.get(room_id, 0) + 1
         self._dirty_rooms.add(room_id)
+        self._room_touched[room_id] = time.time()
 
     def get_room_state(self, room_id: str) -> str:
         """Get the current code state for a room."""
         return self.room_states.get(room_id, "# Start coding here...\n")
 
-    def set_initial_state(self, room_id: str, code: str) -> None:
-        """Set initial state for a room if not already set."""
+    def has_room_state(self, room_id: str) -> bool:
+        """Check whether the room state is already cached in memory."""
+        return room_id in self.room_states
+
+    def set_initial_state(
+        self,
+        room_id: str,
+        code: str,
+        language: str | None = None,
+        revision: int = 0,
+        saved_hash: str | None = None
+    ) -> None:
+        """
+        Set initial state for a room if not already set.
+
+        `saved_hash` is the content hash the database holds for the room.
+        """
         if room_id not in self.room_states:
             self.room_states[room_id] = code
+            self.room_revisions[room_id] = revision
+            self._room_touched[room_id] = time.time()
+            if language:
+                self.room_languages[room_id] = language
+            if saved_hash:
+                self._saved_hashes[room_id] = saved_hash
+
+    def get_saved_hash(self, room_id: str) -> str | None:
+        """Get the content hash last saved to the database for a room."""
+        return self._saved_hashes.get(room_id)
+
+    def set_saved_hash(self, room_id: str, code_hash: str) -> None:
+        """Record the content hash just saved to the database for a room."""
+        self._saved_hashes[room_id] = code_hash
+
+    def load_room_states(self, rooms: Iterable[dict], limit: int | None = None) -> int:
+        """
+        Bulk-load room states (from a snapshot or the database).
+
+        Each entry is a dict with "id", "code" and optional "language",
+        "revision", "saved_hash", "touched_at" and "dirty" keys. Rooms
+        marked dirty (not yet saved to the database) are always loaded and
+        marked dirty again; at most `limit` other rooms are loaded, most
+        recently touched first. Rooms already cached in memory are left
+        untouched. Returns the number of rooms loaded.
+        """
+        rooms = sorted(
+            rooms,
+            key=lambda room: (not room.get("dirty"), -room.get("touched_at", 0))
+        )
+        loaded = 0
+        clean_loaded = 0
+        for room in rooms:
+            room_id = room["id"]
+            dirty = bool(room.get("dirty"))
+            if room_id in self.room_states:
+                if dirty:
+                    print(f"Dropping duplicate unsaved snapshot of room {room_id}")
+                continue
+            if not dirty:
+                if limit is not None and clean_loaded >= limit:
+                    continue
+                clean_loaded += 1
+            self.set_initial_state(
+                room_id,
+                room.get("code") or "",
+                language=room.get("language"),
+                revision=room.get("revision", 0),
+                saved_hash=room.get("saved_hash")
+            )
+            if "touched_at" in room:
+                self._room_touched[room_id] = room["touched_at"]
+            if dirty:
+                self._dirty_rooms.add(room_id)
+            loaded += 1
+        return loaded
+
+    def export_room_states(self, limit: int) -> List[dict]:
+        """
+        Export room states for snapshotting.
+
+        Includes every room with connections, spectators or unsaved
+        changes, plus the `limit` most recently touched other rooms.
+        """
+        busy = self.get_busy_room_ids()
+        idle = sorted(
+            (room_id for room_id in self.room_states if room_id not in busy),
+            key=lambda room_id: self._room_touched.get(room_id, 0),
+            reverse=True
+        )
+        room_ids = [room_id for room_id in busy if room_id in self.room_states]
+        room_ids += idle[:max(limit, 0)]
+        return [
+            {
+                "id": room_id,
+                "code": self.room_states[room_id],
+                "language": self.room_languages.get(room_id),
+                "revision": self.room_revisions.get(room_id, 0),
+                "saved_hash": self._saved_hashes.get(room_id),
+                "touched_at": self._room_touched.get(room_id, 0),
+                "dirty": room_id in self._dirty_rooms,
+            }
+            for room_id in room_ids
+        ]
+
+    def get_busy_room_ids(self) -> Set[str]:
+        """Get rooms that have live connections, spectators or unsaved changes."""
+        return set(self.active_connections) | set(self.spectators) | self._dirty_rooms
+
+    def evict_room_state(self, room_id: str) -> None:
+        """Drop the cached state of a room that has no live connections."""
+        if room_id in self.get_busy_room_ids():
+            return
+        self.room_states.pop(room_id, None)
+        self.room_revisions.pop(room_id, None)
+        self.room_languages.pop(room_id, None)
+        self._saved_hashes.pop(room_id, None)
+        self._room_touched.pop(room_id, None)
 
     def get_connection_count(self, room_id: str) -> int:
         """Get the number of active connections in a room."""
@@ -121,6 +437,14 @@ class ConnectionManager:
                 await save_callback(room_id, code)
                 self._dirty_rooms.discard(room_id)
 
+    async def force_save_all(self, save_callback) -> None:
+        """Force immediate save of every dirty room (used on shutdown)."""
+        for room_id in list(self._dirty_rooms):
+            try:
+                await self.force_save_room(room_id, save_callback)
+            except Exception as e:
+                print(f"Error saving room {room_id}: {e}")
+
 
 # Global connection manager instance
 manager = ConnectionManager()
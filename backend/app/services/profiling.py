@@ -0,0 +1,228 @@
+import asyncio
+import functools
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List
+
+
+class _NoopTimer:
+    """Context manager used when handler timing is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Timer:
+    """Context manager recording one handler call."""
+
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: "HandlerTimings", name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class HandlerTimings:
+    """Per-handler call counts and latencies, collected only when enabled."""
+
+    def __init__(self):
+        self.enabled = False
+        # name -> [count, total seconds, max seconds]
+        self._stats: Dict[str, List[float]] = {}
+
+    def measure(self, name: str):
+        """Context manager timing a block under `name`."""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, name)
+
+    def record(self, name: str, elapsed: float) -> None:
+        """Record one call of `name` that took `elapsed` seconds."""
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Get the collected stats, in milliseconds."""
+        return {
+            name: {
+                "count": int(count),
+                "total_ms": round(total * 1000, 3),
+                "avg_ms": round(total / count * 1000, 3),
+                "max_ms": round(max_ * 1000, 3),
+            }
+            for name, (count, total, max_) in sorted(self._stats.items())
+        }
+
+    def reset(self) -> None:
+        """Clear the collected stats."""
+        self._stats.clear()
+
+
+# Global handler timings instance
+timings = HandlerTimings()
+
+
+def timed(name: str):
+    """Decorator timing a sync or async function under `name`."""
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not timings.enabled:
+                    return await func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    timings.record(name, time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not timings.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the event loop thread's stack from a background thread.
+
+    Output is in the folded-stack format ("root;...;leaf count" per line)
+    read by flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self):
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, seconds: float, interval: float) -> str:
+        """Sample the calling (event loop) thread for `seconds`."""
+        if self._running:
+            raise RuntimeError("A profile is already running")
+        self._running = True
+
+        thread_id = threading.get_ident()
+        samples: Counter = Counter()
+        stop = threading.Event()
+
+        def sampler():
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_format_frame(frame))
+                    frame = frame.f_back
+                if stack:
+                    samples[";".join(reversed(stack))] += 1
+
+        thread = threading.Thread(target=sampler, name="sampling-profiler",
+                                  daemon=True)
+        thread.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(thread.join)
+            self._running = False
+
+        return "".join(f"{stack} {count}\n" for stack, count in samples.items())
+
+
+class LoopLagMonitor:
+    """
+    Logs the event loop's stack when a callback blocks it too long.
+
+    A heartbeat task on the loop updates a timestamp; a watchdog thread
+    dumps the loop thread's stack once per stall past the threshold.
+    """
+
+    def __init__(self):
+        self._beat = 0.0
+        self._task: asyncio.Task | None = None
+        self._stop: threading.Event | None = None
+
+    def start(self, threshold: float, interval: float) -> None:
+        """Start monitoring the running loop (no-op if threshold <= 0)."""
+        if threshold <= 0 or self._task is not None:
+            return
+
+        thread_id = threading.get_ident()
+        stop = threading.Event()
+        self._stop = stop
+        self._beat = time.monotonic()
+
+        async def heartbeat():
+            while True:
+                self._beat = time.monotonic()
+                await asyncio.sleep(interval)
+
+        def watchdog():
+            reported_beat = None
+            while not stop.wait(interval):
+                beat = self._beat
+                lag = time.monotonic() - beat - interval
+                if lag < threshold or beat == reported_beat:
+                    continue
+                reported_beat = beat
+                frame = sys._current_frames().get(thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else ""
+                print(f"Event loop blocked for {lag * 1000:.0f}ms:\n{stack}")
+
+        self._task = asyncio.create_task(heartbeat())
+        threading.Thread(target=watchdog, name="loop-lag-monitor",
+                         daemon=True).start()
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+# Global profiler instances
+profiler = SamplingProfiler()
+lag_monitor = LoopLagMonitor()
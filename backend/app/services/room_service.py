@@ -1,7 +1,14 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.room import Room
+from sqlalchemy import select, delete, insert, update, literal, and_, or_, DateTime
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import noload
+from typing import Collection, Dict, List, Tuple
+from datetime import datetime
+from app.models.room import Room, RoomArchive, CodeBlob, DEFAULT_CODE
 from app.schemas.room import RoomCreate
+from app.services.profiling import timed
+import base64
 import uuid
 
 
@@ -9,40 +16,306 @@ class RoomService:
     """Service for room-related operations."""
 
     @staticmethod
+    @timed("RoomService.store_code")
+    async def store_code(db: AsyncSession, code: str, code_hash: str | None = None) -> str:
+        """
+        Store a code body as a compressed, content-addressed blob.
+
+        Identical bodies share one row; storing an existing body only bumps
+        its last_used_at. Returns the content hash.
+        """
+        code_hash = code_hash or CodeBlob.hash_code(code)
+        values = dict(
+            hash=code_hash,
+            data=CodeBlob.compress(code),
+            size=len(code.encode("utf-8")),
+            last_used_at=datetime.utcnow()
+        )
+
+        if db.get_bind().dialect.name == "sqlite":
+            stmt = sqlite_insert(CodeBlob).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[CodeBlob.hash],
+                set_={"last_used_at": stmt.excluded.last_used_at}
+            )
+        else:
+            stmt = mysql_insert(CodeBlob).values(**values)
+            stmt = stmt.on_duplicate_key_update(
+                last_used_at=stmt.inserted.last_used_at
+            )
+        await db.execute(stmt)
+        return code_hash
+
+    @staticmethod
+    def _new_room(room_id: str, language: str | None, code_hash: str) -> Room:
+        """Build a room holding the default code."""
+        room = Room(id=room_id, language=language or "python", code_hash=code_hash)
+        # Known content - no need to load and decompress the blob
+        room._code = DEFAULT_CODE
+        return room
+
+    @staticmethod
+    @timed("RoomService.create_room")
     async def create_room(db: AsyncSession, room_data: RoomCreate) -> Room:
         """Create a new room."""
-        room = Room(
-            id=str(uuid.uuid4()),
-            language=room_data.language or "python"
+        code_hash = await RoomService.store_code(db, DEFAULT_CODE)
+        room = RoomService._new_room(
+            str(uuid.uuid4()), room_data.language, code_hash
         )
         db.add(room)
         await db.commit()
-        await db.refresh(room)
         return room
 
     @staticmethod
+    @timed("RoomService.create_rooms")
+    async def create_rooms(db: AsyncSession, rooms_data: List[RoomCreate]) -> List[Room]:
+        """Create several rooms in a single transaction."""
+        code_hash = await RoomService.store_code(db, DEFAULT_CODE)
+        rooms = [
+            RoomService._new_room(
+                str(uuid.uuid4()), room_data.language, code_hash
+            )
+            for room_data in rooms_data
+        ]
+        db.add_all(rooms)
+        await db.commit()
+        return rooms
+
+    @staticmethod
+    @timed("RoomService.get_room")
     async def get_room(db: AsyncSession, room_id: str) -> Room | None:
         """Get a room by ID."""
         result = await db.execute(select(Room).where(Room.id == room_id))
         return result.scalar_one_or_none()
 
     @staticmethod
-    async def update_room_code(db: AsyncSession, room_id: str, code: str) -> Room | None:
-        """Update room code."""
-        room = await RoomService.get_room(db, room_id)
-        if room:
-            room.code = code
+    @timed("RoomService.get_rooms")
+    async def get_rooms(db: AsyncSession, room_ids: List[str]) -> List[Room]:
+        """Get several rooms by ID. Missing rooms are omitted."""
+        result = await db.execute(select(Room).where(Room.id.in_(room_ids)))
+        return list(result.scalars().all())
+
+    @staticmethod
+    def encode_cursor(room: Room) -> str:
+        """Encode a room's (updated_at, id) position as an opaque cursor."""
+        raw = f"{room.updated_at.isoformat()}|{room.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        """Decode a cursor from encode_cursor. Raises ValueError if invalid."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            updated_at, room_id = raw.split("|", 1)
+            return datetime.fromisoformat(updated_at), room_id
+        except Exception as e:
+            raise ValueError("Invalid cursor") from e
+
+    @staticmethod
+    @timed("RoomService.list_rooms")
+    async def list_rooms(
+        db: AsyncSession,
+        limit: int,
+        cursor: str | None = None
+    ) -> Tuple[List[Room], str | None]:
+        """
+        List rooms by most recently updated, using keyset pagination.
+
+        Returns the page of rooms and the cursor for the next page
+        (None when there are no more rooms).
+        """
+        # Listings don't return code, so skip loading the blobs
+        query = (
+            select(Room)
+            .options(noload(Room.blob))
+            .order_by(Room.updated_at.desc(), Room.id.desc())
+        )
+        if cursor:
+            updated_at, room_id = RoomService.decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Room.updated_at < updated_at,
+                    and_(Room.updated_at == updated_at, Room.id < room_id)
+                )
+            )
+
+        result = await db.execute(query.limit(limit + 1))
+        rooms = list(result.scalars().all())
+
+        next_cursor = None
+        if len(rooms) > limit:
+            rooms = rooms[:limit]
+            next_cursor = RoomService.encode_cursor(rooms[-1])
+        return rooms, next_cursor
+
+    @staticmethod
+    @timed("RoomService.sweep_idle_rooms")
+    async def sweep_idle_rooms(
+        db: AsyncSession,
+        cutoff: datetime,
+        batch_size: int,
+        archive: bool = False,
+        exclude: Collection[str] = ()
+    ) -> List[str]:
+        """
+        Delete (or archive) one batch of rooms not updated since cutoff.
+
+        Rooms in `exclude` (e.g. rooms with live connections) are kept.
+        Each batch is its own short transaction so row locks are held
+        only briefly. Returns the IDs of the rooms selected for removal.
+        """
+        query = select(Room.id).where(Room.updated_at < cutoff)
+        if exclude:
+            query = query.where(Room.id.notin_(list(exclude)))
+
+        result = await db.execute(
+            query.order_by(Room.updated_at).limit(batch_size)
+        )
+        room_ids = list(result.scalars().all())
+        if not room_ids:
+            return []
+
+        # Re-check the cutoff - a room saved since the SELECT above is kept
+        expired = and_(Room.id.in_(room_ids), Room.updated_at < cutoff)
+
+        if archive:
+            # A room can be archived, visited (recreating it) and go idle
+            # again; the newer copy replaces the old archive row
+            await db.execute(
+                delete(RoomArchive).where(
+                    RoomArchive.id.in_(select(Room.id).where(expired))
+                )
+            )
+            await db.execute(
+                insert(RoomArchive).from_select(
+                    ["id", "code_hash", "code", "language", "created_at",
+                     "updated_at", "archived_at"],
+                    select(Room.id, Room.code_hash, Room.legacy_code, Room.language,
+                           Room.created_at, Room.updated_at,
+                           literal(datetime.utcnow(), DateTime))
+                    .where(expired)
+                )
+            )
+        await db.execute(delete(Room).where(expired))
+        await db.commit()
+        return room_ids
+
+    @staticmethod
+    @timed("RoomService.sweep_orphan_blobs")
+    async def sweep_orphan_blobs(
+        db: AsyncSession,
+        cutoff: datetime,
+        batch_size: int
+    ) -> int:
+        """
+        Delete one batch of code blobs no room or archived room references.
+
+        Only blobs not used since cutoff are considered, so a blob being
+        reused by a concurrent save is never removed. Returns the number
+        of blobs deleted.
+        """
+        unreferenced = and_(
+            CodeBlob.last_used_at < cutoff,
+            ~select(Room.id).where(Room.code_hash == CodeBlob.hash).exists(),
+            ~select(RoomArchive.id)
+            .where(RoomArchive.code_hash == CodeBlob.hash).exists()
+        )
+        result = await db.execute(
+            select(CodeBlob.hash).where(unreferenced).limit(batch_size)
+        )
+        hashes = list(result.scalars().all())
+        if not hashes:
+            return 0
+
+        # Re-check the conditions in case a save claimed a blob meanwhile
+        await db.execute(
+            delete(CodeBlob).where(CodeBlob.hash.in_(hashes), unreferenced)
+        )
+        await db.commit()
+        return len(hashes)
+
+    @staticmethod
+    @timed("RoomService.update_room_code")
+    async def update_room_code(
+        db: AsyncSession,
+        room_id: str,
+        code: str,
+        language: str | None = None,
+        code_hash: str | None = None
+    ) -> bool:
+        """
+        Update room code.
+
+        Skipped when the content hash matches what is already stored.
+        If the room row is missing (swept or removed while its state was
+        still cached) it is recreated so the edits aren't lost.
+        Returns True if the room was written.
+        """
+        code_hash = code_hash or CodeBlob.hash_code(code)
+        result = await db.execute(
+            select(Room.id, Room.code_hash).where(Room.id == room_id)
+        )
+        row = result.first()
+        if row is not None and row.code_hash == code_hash:
+            return False
+
+        await RoomService.store_code(db, code, code_hash)
+        if row is None:
+            print(f"Room {room_id} missing from database, recreating it")
+            db.add(Room(id=room_id, language=language or "python",
+                        code_hash=code_hash))
             await db.commit()
-            await db.refresh(room)
-        return room
+            return True
+
+        await db.execute(
+            update(Room)
+            .where(Room.id == room_id)
+            .values({Room.code_hash: code_hash, Room.legacy_code: None})
+        )
+        await db.commit()
+        return True
 
     @staticmethod
+    @timed("RoomService.get_or_create_room")
     async def get_or_create_room(db: AsyncSession, room_id: str) -> Room:
         """Get existing room or create new one with specified ID."""
         room = await RoomService.get_room(db, room_id)
         if not room:
-            room = Room(id=room_id)
+            code_hash = await RoomService.store_code(db, DEFAULT_CODE)
+            room = RoomService._new_room(room_id, None, code_hash)
             db.add(room)
             await db.commit()
-            await db.refresh(room)
         return room
+
+    @staticmethod
+    @timed("RoomService.get_recent_rooms")
+    async def get_recent_rooms(db: AsyncSession, limit: int) -> List[Room]:
+        """Get the most recently updated rooms."""
+        result = await db.execute(
+            select(Room).order_by(Room.updated_at.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    @staticmethod
+    @timed("RoomService.get_code_hashes")
+    async def get_code_hashes(
+        db: AsyncSession,
+        room_ids: List[str]
+    ) -> Dict[str, Tuple[str | None, str]]:
+        """
+        Get what the database holds for several rooms without loading code.
+
+        Maps room ID to (code_hash column, content hash); the two differ
+        only for legacy rows whose code_hash is still NULL.
+        """
+        result = await db.execute(
+            select(Room.id, Room.code_hash, Room.legacy_code)
+            .where(Room.id.in_(room_ids))
+        )
+        hashes = {}
+        for room_id, code_hash, legacy_code in result.all():
+            content_hash = code_hash or CodeBlob.hash_code(
+                legacy_code if legacy_code is not None else DEFAULT_CODE
+            )
+            hashes[room_id] = (code_hash, content_hash)
+        return hashes
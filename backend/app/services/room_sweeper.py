@@ -0,0 +1,111 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.config import get_settings
+from app.database import async_session_maker
+from app.services.connection_manager import ConnectionManager, manager
+from app.services.room_service import RoomService
+
+
+class RoomSweeper:
+    """Background task that removes idle rooms and unused code blobs."""
+
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        ttl_days: int,
+        interval: float,
+        batch_size: int,
+        batch_pause: float,
+        archive: bool,
+        blob_grace_hours: float
+    ):
+        self.manager = manager
+        self.ttl_days = ttl_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.archive = archive
+        self.blob_grace_hours = blob_grace_hours
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the sweeper loop (no-op if the TTL is disabled)."""
+        if self.ttl_days <= 0 or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the sweeper loop."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def sweep(self) -> int:
+        """Remove all rooms idle past the TTL, one small batch at a time."""
+        cutoff = datetime.utcnow() - timedelta(days=self.ttl_days)
+        total = 0
+        while True:
+            async with async_session_maker() as db:
+                room_ids = await RoomService.sweep_idle_rooms(
+                    db,
+                    cutoff,
+                    self.batch_size,
+                    archive=self.archive,
+                    exclude=self.manager.get_busy_room_ids()
+                )
+            for room_id in room_ids:
+                self.manager.evict_room_state(room_id)
+            total += len(room_ids)
+
+            if len(room_ids) < self.batch_size:
+                return total
+            # Yield between batches so other writers can take the locks
+            await asyncio.sleep(self.batch_pause)
+
+    async def sweep_blobs(self) -> int:
+        """Remove code blobs no longer referenced by any room."""
+        cutoff = datetime.utcnow() - timedelta(hours=self.blob_grace_hours)
+        total = 0
+        while True:
+            async with async_session_maker() as db:
+                removed = await RoomService.sweep_orphan_blobs(
+                    db, cutoff, self.batch_size
+                )
+            total += removed
+
+            if removed < self.batch_size:
+                return total
+            await asyncio.sleep(self.batch_pause)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                removed = await self.sweep()
+                if removed:
+                    action = "Archived" if self.archive else "Deleted"
+                    print(f"{action} {removed} idle rooms")
+                blobs = await self.sweep_blobs()
+                if blobs:
+                    print(f"Deleted {blobs} unused code blobs")
+            except Exception as e:
+                print(f"Room sweep failed: {e}")
+
+
+settings = get_settings()
+
+# Global room sweeper instance
+sweeper = RoomSweeper(
+    manager=manager,
+    ttl_days=settings.ROOM_TTL_DAYS,
+    interval=settings.ROOM_SWEEP_INTERVAL,
+    batch_size=settings.ROOM_SWEEP_BATCH_SIZE,
+    batch_pause=settings.ROOM_SWEEP_BATCH_PAUSE,
+    archive=settings.ROOM_SWEEP_ARCHIVE,
+    blob_grace_hours=settings.CODE_BLOB_GRACE_HOURS
+)
@@ -0,0 +1,185 @@
+import glob
+import gzip
+import json
+import os
+import tempfile
+import time
+from typing import List
+from app.models.room import CodeBlob
+from app.services.connection_manager import ConnectionManager
+from app.services.room_service import RoomService
+from app.database import async_session_maker
+
+SNAPSHOT_VERSION = 2
+
+# Rooms validated against the database per query
+VALIDATE_BATCH_SIZE = 500
+
+
+class SnapshotService:
+    """Service for warm restarts: persisting and preloading hot room state."""
+
+    @staticmethod
+    def write_snapshot(path: str, rooms: List[dict]) -> str:
+        """
+        Write room states to this worker's gzipped JSON snapshot file.
+
+        Each worker writes its own `<path>.<pid>` file, so with several
+        workers no worker's unsaved rooms overwrite another's. Returns the
+        path written.
+        """
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": time.time(),
+            "rooms": rooms,
+        }
+        target = f"{path}.{os.getpid()}"
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix=f"{os.path.basename(path)}.",
+            suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as raw, \
+                    gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, target)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return target
+
+    @staticmethod
+    def claim_snapshots(path: str) -> List[str]:
+        """
+        Claim the snapshot files left by previous workers.
+
+        Files are renamed before reading, so each one is consumed by
+        exactly one worker even when several start at once.
+        """
+        claimed = []
+        for snapshot in glob.glob(f"{glob.escape(path)}.*"):
+            if snapshot.endswith(".tmp") or ".claimed-" in snapshot:
+                continue
+            claim = f"{snapshot}.claimed-{os.getpid()}"
+            try:
+                os.rename(snapshot, claim)
+            except OSError:
+                continue  # Another worker got it first
+            claimed.append(claim)
+        return claimed
+
+    @staticmethod
+    def read_snapshot(path: str, max_age: int) -> List[dict]:
+        """
+        Read room states from a claimed snapshot file and delete it.
+
+        Snapshots older than max_age seconds only contribute their unsaved
+        rooms. Unreadable files or other snapshot versions give no rooms.
+        """
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable room snapshot {path}: {e}")
+            return []
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+        if payload.get("version") != SNAPSHOT_VERSION:
+            return []
+
+        rooms = payload.get("rooms", [])
+        if time.time() - payload.get("created_at", 0) > max_age:
+            print(f"Room snapshot {path} is stale, keeping unsaved rooms only")
+            rooms = [room for room in rooms if room.get("dirty")]
+        return rooms
+
+    @staticmethod
+    async def validate(rooms: List[dict]) -> List[dict]:
+        """
+        Drop snapshot entries that no longer match the database.
+
+        A saved entry is kept only if the database still holds the same
+        code. An unsaved entry is kept only if the database hasn't been
+        written since the snapshotting worker last synced with it (or the
+        row is gone, in which case the save recreates it).
+        """
+        valid = []
+        for i in range(0, len(rooms), VALIDATE_BATCH_SIZE):
+            batch = rooms[i:i + VALIDATE_BATCH_SIZE]
+            async with async_session_maker() as db:
+                stored = await RoomService.get_code_hashes(
+                    db, [room["id"] for room in batch]
+                )
+
+            for room in batch:
+                row = stored.get(room["id"])
+                if room.get("dirty"):
+                    if row is not None and row[0] != room.get("saved_hash"):
+                        print(f"Dropping unsaved snapshot of room {room['id']}: "
+                              "the database has newer code")
+                        continue
+                elif row is None or row[1] != CodeBlob.hash_code(room.get("code") or ""):
+                    continue
+                else:
+                    room["saved_hash"] = row[0]
+                valid.append(room)
+        return valid
+
+    @staticmethod
+    async def preload(
+        manager: ConnectionManager,
+        path: str,
+        max_age: int,
+        limit: int,
+        save_callback
+    ) -> int:
+        """
+        Preload room states into the connection manager.
+
+        Uses the snapshot files left by previous workers (validated against
+        the database) when there are any, otherwise the `limit` most
+        recently updated rooms from the database. At most `limit` saved
+        rooms are loaded either way; unsaved rooms from a snapshot are
+        always loaded and written to the database right away.
+        Returns the number of rooms loaded.
+        """
+        rooms = []
+        for snapshot in SnapshotService.claim_snapshots(path):
+            rooms.extend(SnapshotService.read_snapshot(snapshot, max_age))
+
+        if rooms:
+            rooms = await SnapshotService.validate(rooms)
+            loaded = manager.load_room_states(rooms, limit)
+            await manager.force_save_all(save_callback)
+            return loaded
+
+        if limit <= 0:
+            return 0
+
+        async with async_session_maker() as db:
+            recent = await RoomService.get_recent_rooms(db, limit)
+
+        return manager.load_room_states(
+            {"id": room.id, "code": room.code, "language": room.language,
+             "saved_hash": room.code_hash}
+            for room in recent
+        )
+
+    @staticmethod
+    async def shutdown(
+        manager: ConnectionManager,
+        path: str,
+        limit: int,
+        save_callback
+    ) -> None:
+        """Flush pending saves to the database and snapshot room states."""
+        await manager.force_save_all(save_callback)
+        try:
+            SnapshotService.write_snapshot(path, manager.export_room_states(limit))
+        except OSError as e:
+            print(f"Failed to write room snapshot {path}: {e}")
@@ -0,0 +1,26 @@
+import os
+import tempfile
+
+# Point the app at a throwaway SQLite database before app.database is imported
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+
+import asyncio
+
+import pytest
+
+
+async def _reset_db():
+    from app.database import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Pooled connections are tied to the event loop that opened them
+    await engine.dispose()
+
+
+@pytest.fixture
+def fresh_db():
+    """Start the test with empty tables."""
+    asyncio.run(_reset_db())
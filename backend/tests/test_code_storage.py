@@ -0,0 +1,108 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from app.database import async_session_maker
+from app.models.room import CodeBlob, Room, DEFAULT_CODE
+from app.routers import websocket
+from app.schemas.room import RoomCreate
+from app.services.connection_manager import manager
+from app.services.room_service import RoomService
+
+
+async def _count_blobs() -> int:
+    async with async_session_maker() as db:
+        return (await db.execute(select(func.count()).select_from(CodeBlob))).scalar()
+
+
+async def _identical_content():
+    async with async_session_maker() as db:
+        rooms = await RoomService.create_rooms(db, [RoomCreate(), RoomCreate()])
+    after_create = await _count_blobs()
+
+    for room in rooms:
+        async with async_session_maker() as db:
+            await RoomService.update_room_code(db, room.id, "print('shared')\n")
+    return after_create, await _count_blobs()
+
+
+def test_identical_content_is_stored_once(fresh_db):
+    after_create, after_updates = asyncio.run(_identical_content())
+
+    # Both new rooms share the default template blob
+    assert after_create == 1
+    # Both rooms now share one more blob for the common code
+    assert after_updates == 2
+
+
+async def _save_twice():
+    async with async_session_maker() as db:
+        room = await RoomService.create_room(db, RoomCreate())
+
+    async with async_session_maker() as db:
+        first = await RoomService.update_room_code(db, room.id, "x = 1\n")
+    async with async_session_maker() as db:
+        updated_at = (await RoomService.get_room(db, room.id)).updated_at
+    async with async_session_maker() as db:
+        second = await RoomService.update_room_code(db, room.id, "x = 1\n")
+    async with async_session_maker() as db:
+        stored = await RoomService.get_room(db, room.id)
+    return first, second, updated_at, stored
+
+
+def test_unchanged_save_does_not_write(fresh_db):
+    first, second, updated_at, stored = asyncio.run(_save_twice())
+
+    assert first is True
+    assert second is False
+    assert stored.updated_at == updated_at
+    assert stored.code == "x = 1\n"
+
+
+def test_save_with_known_hash_skips_database(monkeypatch):
+    def no_session():
+        raise AssertionError("unchanged save opened a database session")
+
+    monkeypatch.setattr(websocket, "async_session_maker", no_session)
+    manager.set_saved_hash("cached-room", CodeBlob.hash_code("y = 2\n"))
+    try:
+        asyncio.run(websocket.save_room_to_db("cached-room", "y = 2\n"))
+    finally:
+        manager.evict_room_state("cached-room")
+
+
+async def _legacy_room():
+    async with async_session_maker() as db:
+        db.add(Room(id="legacy", legacy_code="old = True\n"))
+        db.add(Room(id="empty"))
+        await db.commit()
+
+    async with async_session_maker() as db:
+        legacy = await RoomService.get_room(db, "legacy")
+        empty = await RoomService.get_room(db, "empty")
+    before = (legacy.code, legacy.code_hash, empty.code)
+
+    async with async_session_maker() as db:
+        await RoomService.update_room_code(db, "legacy", "new = True\n")
+    async with async_session_maker() as db:
+        migrated = await RoomService.get_room(db, "legacy")
+    return before, migrated
+
+
+def test_legacy_rows_read_from_old_column_until_saved(fresh_db):
+    before, migrated = asyncio.run(_legacy_room())
+
+    assert before == ("old = True\n", None, DEFAULT_CODE)
+    assert migrated.legacy_code is None
+    assert migrated.code_hash == CodeBlob.hash_code("new = True\n")
+    assert migrated.code == "new = True\n"
+
+
+def test_blob_decompresses_lazily():
+    code = "def f():\n    return 42\n"
+    blob = CodeBlob(hash=CodeBlob.hash_code(code), data=CodeBlob.compress(code),
+                    size=len(code))
+
+    assert "_text" not in blob.__dict__
+    assert blob.text == code
+    assert blob.__dict__["_text"] == code
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.services.connection_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket."""
+
+    def __init__(self, close_delay: float = 0.0):
+        self.sent = []
+        self.closed_with = None
+        self.close_delay = close_delay
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        self.sent.append(data)
+
+    async def send_json(self, data: dict):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        await asyncio.sleep(self.close_delay)
+        self.closed_with = code
+
+
+async def _reap_slow_sockets():
+    manager = ConnectionManager()
+    sockets = [FakeWebSocket(close_delay=0.2) for _ in range(5)]
+    for websocket in sockets:
+        await manager.connect(websocket, "room")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    reaped = await manager.reap_idle_connections(idle_timeout=0)
+    return manager, sockets, reaped, loop.time() - start
+
+
+def test_reaper_closes_idle_connections_in_parallel():
+    manager, sockets, reaped, elapsed = asyncio.run(_reap_slow_sockets())
+
+    assert reaped == 5
+    assert all(websocket.closed_with == 1001 for websocket in sockets)
+    assert manager.get_connection_count("room") == 0
+    # Closed concurrently, not one close timeout after another
+    assert elapsed < 0.5
+
+
+class StuckWebSocket(FakeWebSocket):
+    """Spectator whose sends never complete."""
+
+    async def send_text(self, data: str):
+        if self.sent:
+            await asyncio.sleep(10)
+        self.sent.append(data)
+
+
+async def _flush_with_stuck_spectator():
+    manager = ConnectionManager()
+    manager.SPECTATOR_FLUSH_INTERVAL = 0.01
+    manager.SPECTATOR_SEND_TIMEOUT = 0.05
+    manager.set_initial_state("room", "start")
+
+    healthy, stuck = FakeWebSocket(), StuckWebSocket()
+    await manager.connect_spectator(healthy, "room")
+    await manager.connect_spectator(stuck, "room")
+
+    for i in range(3):
+        manager.update_room_state("room", f"edit {i}")
+    await asyncio.sleep(0.2)
+    return manager, healthy, stuck
+
+
+def test_spectators_get_coalesced_updates_and_stuck_ones_are_closed():
+    manager, healthy, stuck = asyncio.run(_flush_with_stuck_spectator())
+
+    assert healthy.sent == [
+        '{"type":"init","code":"start"}',
+        '{"type":"code_update","code":"edit 2"}',
+    ]
+    assert stuck.closed_with == 1013
+    assert manager.get_spectator_count("room") == 1
@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app import dependencies
+from app.routers import admin
+from app.services.profiling import SamplingProfiler, profiler, timed, timings
+
+
+def _require_admin_status(token):
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(dependencies.require_admin(token))
+    return exc_info.value.status_code
+
+
+def test_require_admin_is_hidden_without_token(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "ADMIN_TOKEN", "")
+
+    assert _require_admin_status("anything") == 404
+
+
+def test_require_admin_rejects_wrong_token(monkeypatch):
+    monkeypatch.setattr(dependencies.settings, "ADMIN_TOKEN", "secret")
+
+    assert _require_admin_status("wrong") == 401
+    assert _require_admin_status(None) == 401
+    assert asyncio.run(dependencies.require_admin("secret")) is None
+
+
+@timed("test.sleepy")
+def _sleepy(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@timed("test.async_sleepy")
+async def _async_sleepy(seconds: float) -> float:
+    await asyncio.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def clean_timings():
+    timings.reset()
+    yield timings
+    timings.enabled = False
+    timings.reset()
+
+
+def test_nothing_recorded_while_disabled(clean_timings):
+    clean_timings.enabled = False
+
+    _sleepy(0)
+    asyncio.run(_async_sleepy(0))
+    with clean_timings.measure("test.block"):
+        pass
+
+    assert clean_timings.snapshot() == {}
+
+
+def test_counts_and_max_recorded_while_enabled(clean_timings):
+    clean_timings.enabled = True
+
+    _sleepy(0)
+    _sleepy(0.02)
+    assert asyncio.run(_async_sleepy(0.01)) == 0.01
+    with clean_timings.measure("test.block"):
+        pass
+
+    stats = clean_timings.snapshot()
+    assert stats["test.sleepy"]["count"] == 2
+    assert stats["test.sleepy"]["max_ms"] >= 20
+    assert stats["test.async_sleepy"]["count"] == 1
+    assert stats["test.async_sleepy"]["max_ms"] >= 10
+    assert stats["test.block"]["count"] == 1
+
+
+def _busy_loop(seconds: float) -> None:
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        pass
+
+
+async def _profile_busy_loop():
+    sampler = SamplingProfiler()
+    profile = asyncio.create_task(sampler.profile(0.2, 0.005))
+    await asyncio.sleep(0)
+    _busy_loop(0.1)
+    return await profile
+
+
+def test_profile_returns_folded_stacks():
+    folded = asyncio.run(_profile_busy_loop())
+
+    lines = folded.splitlines()
+    assert lines
+    for line in lines:
+        _, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+    assert any("_busy_loop" in line.split(";")[-1] for line in lines)
+
+
+async def _concurrent_profiles():
+    first = asyncio.create_task(admin.run_profile(seconds=0.05, interval_ms=5))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as exc_info:
+        await admin.run_profile(seconds=0.05, interval_ms=5)
+    await first
+    return exc_info.value.status_code
+
+
+def test_concurrent_profile_is_rejected():
+    assert asyncio.run(_concurrent_profiles()) == 409
+    assert not profiler.running
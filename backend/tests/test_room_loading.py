@@ -0,0 +1,78 @@
+import asyncio
+
+from app.database import async_session_maker
+from app.routers import websocket
+from app.services.connection_manager import manager
+from app.services.room_service import RoomService
+
+
+class ClosingWebSocket:
+    """Stand-in for a Starlette WebSocket that records accept/close."""
+
+    def __init__(self):
+        self.accepted = False
+        self.closed_with = None
+
+    async def accept(self):
+        self.accepted = True
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        self.closed_with = code
+
+
+async def _watch_missing_room():
+    ws = ClosingWebSocket()
+    await websocket.spectator_endpoint(ws, "missing-room")
+    async with async_session_maker() as db:
+        room = await RoomService.get_room(db, "missing-room")
+    return ws, room
+
+
+def test_spectator_cannot_create_room(fresh_db):
+    ws, room = asyncio.run(_watch_missing_room())
+
+    assert ws.accepted
+    assert ws.closed_with == websocket.ROOM_NOT_FOUND_CLOSE_CODE
+    assert room is None
+    assert not manager.has_room_state("missing-room")
+
+
+async def _concurrent_loads(room_id: str, create: bool, monkeypatch) -> tuple:
+    calls = []
+    get_or_create_room = RoomService.get_or_create_room
+
+    async def counting_get_or_create(db, room_id):
+        calls.append(room_id)
+        await asyncio.sleep(0.01)
+        return await get_or_create_room(db, room_id)
+
+    monkeypatch.setattr(RoomService, "get_or_create_room", counting_get_or_create)
+
+    loads = [websocket.load_room_state(room_id, create=create)]
+    loads += [websocket.load_room_state(room_id) for _ in range(4)]
+    results = await asyncio.gather(*loads)
+    return results, calls
+
+
+def test_concurrent_cold_loads_share_one_lookup(fresh_db, monkeypatch):
+    try:
+        results, calls = asyncio.run(_concurrent_loads("cold-room", True, monkeypatch))
+    finally:
+        manager.evict_room_state("cold-room")
+
+    assert results == [True] * 5
+    assert calls == ["cold-room"]
+    assert websocket._room_loads == {}
+
+
+def test_editor_creates_room_after_spectator_lookup(fresh_db, monkeypatch):
+    try:
+        results, calls = asyncio.run(_concurrent_loads("new-room", False, monkeypatch))
+        loaded = manager.has_room_state("new-room")
+    finally:
+        manager.evict_room_state("new-room")
+
+    # The spectator's lookup finds nothing; the editors then create the room once
+    assert results == [False] + [True] * 4
+    assert calls == ["new-room"]
+    assert loaded
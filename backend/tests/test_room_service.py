@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.database import async_session_maker
+from app.models.room import Room, RoomArchive
+from app.services.room_service import RoomService
+
+
+async def _add_idle_room(room_id: str, code: str, idle_days: int) -> None:
+    updated_at = datetime.utcnow() - timedelta(days=idle_days)
+    async with async_session_maker() as db:
+        db.add(Room(id=room_id, legacy_code=code,
+                    created_at=updated_at, updated_at=updated_at))
+        await db.commit()
+
+
+async def _sweep(archive: bool = True):
+    cutoff = datetime.utcnow() - timedelta(days=30)
+    async with async_session_maker() as db:
+        return await RoomService.sweep_idle_rooms(db, cutoff, 10, archive=archive)
+
+
+async def _archive_twice():
+    await _add_idle_room("room-1", "first", idle_days=60)
+    assert await _sweep() == ["room-1"]
+
+    # Visiting the archived room's URL recreates it; then it goes idle again
+    await _add_idle_room("room-1", "second", idle_days=40)
+    assert await _sweep() == ["room-1"]
+
+    async with async_session_maker() as db:
+        archived = (await db.execute(select(RoomArchive))).scalars().all()
+        remaining = (await db.execute(select(Room))).scalars().all()
+    return archived, remaining
+
+
+def test_archiving_same_room_twice_replaces_archive_row(fresh_db):
+    archived, remaining = asyncio.run(_archive_twice())
+
+    assert remaining == []
+    assert [(room.id, room.code) for room in archived] == [("room-1", "second")]
+
+
+async def _sweep_skips_fresh_rooms():
+    await _add_idle_room("idle", "old", idle_days=60)
+    await _add_idle_room("fresh", "new", idle_days=1)
+    removed = await _sweep(archive=False)
+
+    async with async_session_maker() as db:
+        remaining = (await db.execute(select(Room.id))).scalars().all()
+    return removed, remaining
+
+
+def test_sweep_only_removes_idle_rooms(fresh_db):
+    removed, remaining = asyncio.run(_sweep_skips_fresh_rooms())
+
+    assert removed == ["idle"]
+    assert remaining == ["fresh"]
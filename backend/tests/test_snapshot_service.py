@@ -0,0 +1,101 @@
+import asyncio
+import os
+
+from app.database import async_session_maker
+from app.models.room import CodeBlob, DEFAULT_CODE
+from app.schemas.room import RoomCreate
+from app.services.connection_manager import ConnectionManager
+from app.services.room_service import RoomService
+from app.services.snapshot_service import SnapshotService
+
+
+async def _create_rooms(count: int):
+    async with async_session_maker() as db:
+        return await RoomService.create_rooms(db, [RoomCreate() for _ in range(count)])
+
+
+async def _preload(path: str, limit: int = 200):
+    manager = ConnectionManager()
+    saved = {}
+
+    async def save(room_id, code):
+        saved[room_id] = code
+
+    loaded = await SnapshotService.preload(manager, path, 3600, limit, save)
+    return manager, loaded, saved
+
+
+async def _consume_once(path: str):
+    room = (await _create_rooms(1))[0]
+    SnapshotService.write_snapshot(path, [
+        {"id": room.id, "code": DEFAULT_CODE, "language": "python",
+         "saved_hash": room.code_hash, "touched_at": 1.0, "dirty": False},
+    ])
+    manager, loaded, _ = await _preload(path)
+    return room, manager, loaded
+
+
+def test_snapshot_is_consumed_once(fresh_db, tmp_path):
+    path = str(tmp_path / "snapshot.json.gz")
+    room, manager, loaded = asyncio.run(_consume_once(path))
+
+    assert loaded == 1
+    assert manager.room_languages[room.id] == "python"
+    # The snapshot file is gone, so the next worker can't reload it
+    assert os.listdir(tmp_path) == []
+
+
+async def _validation(path: str):
+    fresh, stale, unsaved, overwritten = await _create_rooms(4)
+    async with async_session_maker() as db:
+        await RoomService.update_room_code(db, stale.id, "changed elsewhere\n")
+    async with async_session_maker() as db:
+        await RoomService.update_room_code(db, overwritten.id, "newer\n")
+
+    SnapshotService.write_snapshot(path, [
+        {"id": fresh.id, "code": DEFAULT_CODE, "saved_hash": fresh.code_hash},
+        {"id": stale.id, "code": DEFAULT_CODE, "saved_hash": stale.code_hash},
+        {"id": unsaved.id, "code": "unsaved\n", "saved_hash": unsaved.code_hash,
+         "dirty": True},
+        {"id": overwritten.id, "code": "older\n",
+         "saved_hash": overwritten.code_hash, "dirty": True},
+    ])
+    manager, loaded, saved = await _preload(path)
+    async with async_session_maker() as db:
+        stored = await RoomService.get_room(db, overwritten.id)
+    return (fresh, stale, unsaved, overwritten), manager, loaded, saved, stored
+
+
+def test_preload_drops_entries_that_no_longer_match_the_database(fresh_db, tmp_path):
+    path = str(tmp_path / "snapshot.json.gz")
+    rooms, manager, loaded, saved, stored = asyncio.run(_validation(path))
+    fresh, stale, unsaved, overwritten = rooms
+
+    assert loaded == 2
+    assert manager.get_room_state(fresh.id) == DEFAULT_CODE
+    assert manager.get_saved_hash(fresh.id) == CodeBlob.hash_code(DEFAULT_CODE)
+    # The database changed since the snapshot: use the database instead
+    assert not manager.has_room_state(stale.id)
+    assert not manager.has_room_state(overwritten.id)
+    assert stored.code == "newer\n"
+    # Unsaved changes are restored and written back right away
+    assert saved == {unsaved.id: "unsaved\n"}
+
+
+def test_export_and_preload_are_capped(tmp_path):
+    manager = ConnectionManager()
+    for i in range(5):
+        manager.set_initial_state(f"room{i}", f"code {i}")
+        manager._room_touched[f"room{i}"] = float(i)
+    manager.update_room_state("room0", "edited")
+
+    exported = manager.export_room_states(2)
+
+    # The dirty room is always kept, plus the two most recently touched
+    assert sorted(room["id"] for room in exported) == ["room0", "room3", "room4"]
+
+    restored = ConnectionManager()
+    assert restored.load_room_states(exported, 1) == 2
+    assert restored.has_room_state("room0")
+    assert restored.has_room_state("room4")
+    assert not restored.has_room_state("room3")